@@ -2,12 +2,37 @@ import re
 import time
 import json
 import argparse
+import base64
 import sys
 import os
 import csv
-from typing import Dict, Any, Optional, IO, List
-from urllib import request, error
-from urllib.parse import urljoin
+from array import array
+from collections import deque
+import http.client
+import queue
+import signal
+import threading
+from typing import Dict, Any, Optional, IO, List, Tuple, Deque
+from urllib.parse import urljoin, urlsplit, unquote
+from urllib.request import getproxies, proxy_bypass
+
+try:
+    import orjson  # optional: much faster serialization of snapshot payloads
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    def _dumps_str(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _dumps_str(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
 # Per-UE state container
 UEState = Dict[str, Any]
@@ -16,25 +41,24 @@ state: Dict[int, UEState] = {}
 # Output sinks and runtime flags
 _OUT_FP: Optional[IO[str]] = None
 _CSV_FP: Optional[IO[str]] = None
-_CSV_WRITER: Optional[csv.DictWriter] = None
+_CSV_WRITER: Optional[Any] = None  # csv.writer over _CSV_FP
 _VERBOSE: bool = False
 _SOURCE: str = "OAI"
 
-# Diagnostics counters
-_counts = {
-    "lines": 0,
-    "header": 0,
-    "cqi": 0,
-    "dlsch": 0,
-    "ulsch": 0,
-    "dl_bytes": 0,
-    "ul_bytes": 0,
-    "lcid": 0,
-    "snapshots": 0,
-    "posted_batches": 0,
-    "posted_snapshots": 0,
-    "post_errors": 0,
-}
+# Diagnostics counters: slots in the _counts array, and the matching labels used in the summary.
+# Each slot is written by a single thread: C_POST_QUEUE_DROPPED by the parser (queue full),
+# the other post counters by the poster thread (buffer evictions, unsent at shutdown).
+(
+    C_LINES, C_HEADER, C_CQI, C_DLSCH, C_ULSCH, C_DL_BYTES, C_UL_BYTES, C_LCID,
+    C_SNAPSHOTS, C_POSTED_BATCHES, C_POSTED_SNAPSHOTS, C_POST_ERRORS, C_POST_DROPPED,
+    C_POST_QUEUE_DROPPED,
+) = range(14)
+_COUNT_NAMES = (
+    "lines", "headers", "cqi", "dlsch", "ulsch", "dl_bytes", "ul_bytes", "lcid",
+    "snapshots", "posted_batches", "posted_snapshots", "post_errors", "post_dropped",
+    "post_queue_dropped",
+)
+_counts = array("Q", [0]) * len(_COUNT_NAMES)
 
 # Posting config/state
 _POST_URL: Optional[str] = None
@@ -44,23 +68,66 @@ _BACKOFF_BASE: float = 0.5
 _SEND_INTERVAL: float = 1.0  # seconds; send once per interval
 _ONE_AT_A_TIME: bool = True  # DEFAULT: send exactly one snapshot per interval
 _SEND_ORDER: str = "latest"  # DEFAULT: send the newest snapshot; drop older ones
-_buffer: List[dict] = []
+_BUFFER_MAX: int = 1024
+_buffer: Deque[dict] = deque(maxlen=_BUFFER_MAX)  # owned by the poster thread; oldest dropped when full
 _last_post_ms: int = 0
 
+# Snapshots are handed to a background poster thread so network latency never blocks parsing
+_POST_QUEUE_SIZE: int = _BUFFER_MAX
+_post_q: "queue.Queue[Any]" = queue.Queue(maxsize=_POST_QUEUE_SIZE)
+_POST_STOP = object()  # sentinel: final forced flush, then exit
+_poster: Optional[threading.Thread] = None
+
 # CSV config
 _CSV_PATH: str = ""
 
+# Snapshot schema, in output order: (CSV column, snapshot section or None for top level,
+# snapshot key, UE state key, conversion applied to the state value "{}").
+# Drives both the generated snapshot builder and the CSV header.
+_SNAPSHOT_FIELDS = (
+    ("pci", None, "pci", "pci", "{} or 0"),
+    ("rnti", None, "rnti", "rnti", "{}"),
+    ("dl_cqi", "downlink", "cqi", "dl_cqi", "{} or 0"),
+    ("dl_ri", "downlink", "ri", "dl_ri", "{} or 0"),
+    ("dl_mcs", "downlink", "mcs", "dl_mcs", "{} or 0"),
+    ("dl_bitrate", "downlink", "bitrate", "dl_bitrate", "int({} or 0)"),
+    ("dl_packets_ok", "downlink", "packets_ok", "dl_packets_ok", "int({} or 0)"),
+    ("dl_packets_nok", "downlink", "packets_nok", "dl_packets_nok", "int({} or 0)"),
+    ("dl_drop_rate", "downlink", "drop_rate", "dl_drop_rate", "float({} or 0.0)"),
+    ("dl_buffer_status", "downlink", "buffer_status", "dl_buffer_status", "int({} or 0)"),
+    ("ul_pusch_sinr", "uplink", "pusch_sinr", "ul_snr", "float({} or 0.0)"),
+    ("ul_rsrp", "uplink", "rsrp", "rsrp", "float({} or 0.0)"),
+    ("ul_ri", "uplink", "ri", "ul_ri", "{} or 0"),
+    ("ul_mcs", "uplink", "mcs", "ul_mcs", "{} or 0"),
+    ("ul_bitrate", "uplink", "bitrate", "ul_bitrate", "int({} or 0)"),
+    ("ul_packets_ok", "uplink", "packets_ok", "ul_packets_ok", "int({} or 0)"),
+    ("ul_packets_nok", "uplink", "packets_nok", "ul_packets_nok", "int({} or 0)"),
+    ("ul_drop_rate", "uplink", "drop_rate", "ul_drop_rate", "float({} or 0.0)"),
+    ("ul_bsr", "uplink", "bsr", "ul_bsr", "int({} or 0)"),
+    ("ul_timing_advance", "uplink", "timing_advance", "ul_timing_advance", "int({} or 0)"),
+    ("ul_phr", "uplink", "phr", "phr", "float({} or 0.0)"),
+)
+_CSV_FIELDS = ("timestamp", "source") + tuple(f[0] for f in _SNAPSHOT_FIELDS)
+
+# Block size for reading the log in follow mode, and write buffer size for output files
+_READ_CHUNK: int = 1 << 16
+_WRITE_BUFFER: int = 1 << 16
+
+# Sinks are not flushed per line; flush every N snapshots (0 = only when idle/at exit)
+_FLUSH_EVERY: int = 0
+
 def _set_output(path: str):
     """
     Configure NDJSON output sink.
     '-' or '' means stdout; otherwise append to the specified file.
     """
-    global _OUT_FP
+    global _OUT_FP, _write_json_line
     if path == "-" or not path.strip():
         _OUT_FP = None  # use stdout
     else:
         os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        _OUT_FP = open(path, "a", buffering=1, encoding="utf-8")  # line-buffered
+        _OUT_FP = open(path, "a", buffering=_WRITE_BUFFER, encoding="utf-8")  # block-buffered; see _flush_sinks
+    _write_json_line = _make_json_writer(_OUT_FP)
 
 def _set_csv_output(path: str):
     """
@@ -72,27 +139,37 @@ def _set_csv_output(path: str):
     _CSV_PATH = path
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     is_new = not os.path.exists(path) or os.path.getsize(path) == 0
-    _CSV_FP = open(path, "a", newline="", encoding="utf-8")
-    fieldnames = [
-        "timestamp","source","pci","rnti",
-        "dl_cqi","dl_ri","dl_mcs","dl_bitrate","dl_packets_ok","dl_packets_nok","dl_drop_rate","dl_buffer_status",
-        "ul_pusch_sinr","ul_rsrp","ul_ri","ul_mcs","ul_bitrate","ul_packets_ok","ul_packets_nok","ul_drop_rate","ul_bsr","ul_timing_advance","ul_phr",
-    ]
-    _CSV_WRITER = csv.DictWriter(_CSV_FP, fieldnames=fieldnames)
+    _CSV_FP = open(path, "a", newline="", buffering=_WRITE_BUFFER, encoding="utf-8")
+    _CSV_WRITER = csv.writer(_CSV_FP)
     if is_new:
-        _CSV_WRITER.writeheader()
+        _CSV_WRITER.writerow(_CSV_FIELDS)
 
-def _write_json_line(obj: dict):
+def _make_json_writer(fp: Optional[IO[str]]):
     """
-    Write a single NDJSON line to the configured sink.
+    Build the NDJSON line writer for a sink (None means stdout), with the serializer
+    and the sink's write bound once instead of looked up on every snapshot.
     """
-    line = json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
-    if _OUT_FP is None:
-        sys.stdout.write(line + "\n")
-        sys.stdout.flush()
-    else:
-        _OUT_FP.write(line + "\n")
-        _OUT_FP.flush()
+    dumps = _dumps_str
+    write = (sys.stdout if fp is None else fp).write
+
+    def _write_json_line(obj: dict):
+        """
+        Write a single NDJSON line to the configured sink (flushed by _flush_sinks).
+        """
+        write(dumps(obj) + "\n")
+
+    return _write_json_line
+
+_write_json_line = _make_json_writer(None)
+
+def _csv_row(ts: Any, src: str, ue: dict) -> tuple:
+    """
+    Build one CSV row for a snapshot UE entry (as made by _build_snapshot), in _CSV_FIELDS order.
+    """
+    return (ts, src) + tuple(
+        ue[key] if section is None else ue[section][key]
+        for _col, section, key, _state_key, _conv in _SNAPSHOT_FIELDS
+    )
 
 def _write_csv_rows(snapshot: dict):
     """
@@ -103,34 +180,19 @@ def _write_csv_rows(snapshot: dict):
     ts = snapshot.get("timestamp")
     src = snapshot.get("source", _SOURCE)
     ues = snapshot.get("ues") or []
-    for ue in ues:
-        row = {
-            "timestamp": ts,
-            "source": src,
-            "pci": ue.get("pci", 0),
-            "rnti": ue.get("rnti", 0),
-            "dl_cqi": ((ue.get("downlink") or {}).get("cqi") or 0),
-            "dl_ri": ((ue.get("downlink") or {}).get("ri") or 0),
-            "dl_mcs": ((ue.get("downlink") or {}).get("mcs") or 0),
-            "dl_bitrate": ((ue.get("downlink") or {}).get("bitrate") or 0),
-            "dl_packets_ok": ((ue.get("downlink") or {}).get("packets_ok") or 0),
-            "dl_packets_nok": ((ue.get("downlink") or {}).get("packets_nok") or 0),
-            "dl_drop_rate": ((ue.get("downlink") or {}).get("drop_rate") or 0.0),
-            "dl_buffer_status": ((ue.get("downlink") or {}).get("buffer_status") or 0),
-            "ul_pusch_sinr": ((ue.get("uplink") or {}).get("pusch_sinr") or 0.0),
-            "ul_rsrp": ((ue.get("uplink") or {}).get("rsrp") or 0.0),
-            "ul_ri": ((ue.get("uplink") or {}).get("ri") or 0),
-            "ul_mcs": ((ue.get("uplink") or {}).get("mcs") or 0),
-            "ul_bitrate": ((ue.get("uplink") or {}).get("bitrate") or 0),
-            "ul_packets_ok": ((ue.get("uplink") or {}).get("packets_ok") or 0),
-            "ul_packets_nok": ((ue.get("uplink") or {}).get("packets_nok") or 0),
-            "ul_drop_rate": ((ue.get("uplink") or {}).get("drop_rate") or 0.0),
-            "ul_bsr": ((ue.get("uplink") or {}).get("bsr") or 0),
-            "ul_timing_advance": ((ue.get("uplink") or {}).get("timing_advance") or 0),
-            "ul_phr": ((ue.get("uplink") or {}).get("phr") or 0.0),
-        }
-        _CSV_WRITER.writerow(row)
-        _CSV_FP.flush()
+    _CSV_WRITER.writerows([_csv_row(ts, src, ue) for ue in ues])
+
+def _flush_sinks():
+    """
+    Flush NDJSON and CSV sinks. Called periodically (--flush-every), when the
+    follow loop is idle, and before exit.
+    """
+    try:
+        (sys.stdout if _OUT_FP is None else _OUT_FP).flush()
+        if _CSV_FP is not None:
+            _CSV_FP.flush()
+    except Exception as e:
+        _eprint(f"Flush failed: {e}")
 
 def _eprint(msg: str):
     if _VERBOSE:
@@ -141,14 +203,15 @@ def _now_ms() -> int:
     return int(time.time() * 1000)
 
 def _parse_rnti(rnti_str: str) -> int:
-    s = rnti_str.strip().lower()
-    if s.startswith("0x"):
-        s = s[2:]
-    if s.isdigit():
-        return int(s, 10)
-    return int(s, 16)
+    # Captures are bare [0-9a-fA-F]+ (no whitespace, no 0x prefix), so no normalization
+    # is needed. All-digit RNTIs are read as decimal, as before, to keep emitted IDs stable.
+    if rnti_str.isdigit():
+        return int(rnti_str)
+    return int(rnti_str, 16)
 
 def _init_ue(rnti: int) -> UEState:
+    # Flat layout: downlink/uplink fields carry a "dl_"/"ul_" prefix instead of living
+    # in nested dicts, so every access on the hot path is a single dict lookup.
     return {
         "rnti": rnti,
         "pci": 0,
@@ -157,37 +220,33 @@ def _init_ue(rnti: int) -> UEState:
         "pcmax": None,
         "rsrp": None,
         "ssb_sinr": None,
-        "dl": {
-            "cqi": None,
-            "ri": None,
-            "mcs": None,
-            "a": 0,
-            "errors": 0,
-            "packets_ok": 0,
-            "packets_nok": 0,
-            "drop_rate": 0.0,
-            "total_bytes": 0,
-            "last_total_bytes": None,
-            "last_t_ms": None,
-            "bitrate": 4e6,
-            "buffer_status": 0,
-        },
-        "ul": {
-            "ri": None,
-            "mcs": None,
-            "snr": None,
-            "a": 0,
-            "errors": 0,
-            "packets_ok": 0,
-            "packets_nok": 0,
-            "drop_rate": 0.0,
-            "total_bytes_rx": 0,
-            "last_total_bytes_rx": None,
-            "last_t_ms": None,
-            "bitrate": 0,
-            "bsr": 0,
-            "timing_advance": 0,
-        },
+        "dl_cqi": None,
+        "dl_ri": None,
+        "dl_mcs": None,
+        "dl_a": 0,
+        "dl_errors": 0,
+        "dl_packets_ok": 0,
+        "dl_packets_nok": 0,
+        "dl_drop_rate": 0.0,
+        "dl_total_bytes": 0,
+        "dl_last_total_bytes": None,
+        "dl_last_t_ms": None,
+        "dl_bitrate": 4e6,
+        "dl_buffer_status": 0,
+        "ul_ri": None,
+        "ul_mcs": None,
+        "ul_snr": None,
+        "ul_a": 0,
+        "ul_errors": 0,
+        "ul_packets_ok": 0,
+        "ul_packets_nok": 0,
+        "ul_drop_rate": 0.0,
+        "ul_total_bytes_rx": 0,
+        "ul_last_total_bytes_rx": None,
+        "ul_last_t_ms": None,
+        "ul_bitrate": 0,
+        "ul_bsr": 0,
+        "ul_timing_advance": 0,
     }
 
 def _get_ue(rnti: int) -> UEState:
@@ -195,34 +254,71 @@ def _get_ue(rnti: int) -> UEState:
         state[rnti] = _init_ue(rnti)
     return state[rnti]
 
-def _compute_bitrate(prev_bytes: Optional[int], prev_t_ms: Optional[int], cur_bytes: int, cur_t_ms: int) -> Optional[float]:
-    if prev_bytes is None or prev_t_ms is None:
-        return None
-    dt_s = (cur_t_ms - prev_t_ms) / 1000.0
-    if dt_s <= 0:
-        return None
-    dbytes = max(0, cur_bytes - prev_bytes)
-    return 4e6 #(dbytes * 8.0) / dt_s
+# Keep-alive HTTP connections reused across posts, keyed by (scheme, host[:port]).
+# Each entry is (connection, extra request headers, whether to send absolute-form URLs),
+# the latter two being set when a plain-http request goes through a forward proxy.
+_CONNS: Dict[Tuple[str, str], Tuple[http.client.HTTPConnection, Dict[str, str], bool]] = {}
 
-def _update_pkt_stats(side: Dict[str, Any]):
-    a = int(side.get("a", 0))
-    errors = int(side.get("errors", 0))
-    ok = max(0, a - errors)
-    side["packets_ok"] = ok
-    side["packets_nok"] = errors
-    side["drop_rate"] = (errors / a * 100.0) if a > 0 else 0.0
+def _proxy_for(scheme: str, netloc: str):
+    """
+    Return the proxy URL (split) to use for scheme/netloc, honoring http_proxy,
+    https_proxy and no_proxy the way urllib does, or None for a direct connection.
+    """
+    proxy = getproxies().get(scheme)
+    if not proxy or proxy_bypass(netloc):
+        return None
+    if "://" not in proxy:
+        proxy = "http://" + proxy
+    return urlsplit(proxy)
+
+def _proxy_auth_headers(proxy) -> Dict[str, str]:
+    if proxy.username is None:
+        return {}
+    cred = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    return {"Proxy-Authorization": "Basic " + base64.b64encode(cred.encode("utf-8")).decode("ascii")}
+
+def _get_conn(scheme: str, netloc: str, timeout: float) -> Tuple[http.client.HTTPConnection, Dict[str, str], bool]:
+    key = (scheme, netloc)
+    entry = _CONNS.get(key)
+    if entry is None:
+        if scheme not in ("http", "https"):
+            raise ValueError(f"unsupported URL scheme {scheme!r}")
+        proxy = _proxy_for(scheme, netloc)
+        if proxy is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            entry = (cls(netloc, timeout=timeout), {}, False)
+        elif scheme == "https":
+            # CONNECT tunnel through the proxy, TLS end-to-end with the target
+            conn = http.client.HTTPSConnection(proxy.hostname, proxy.port, timeout=timeout)
+            conn.set_tunnel(netloc, headers=_proxy_auth_headers(proxy) or None)
+            entry = (conn, {}, False)
+        else:
+            # Plain http: send absolute-form request URLs to the proxy
+            conn = http.client.HTTPConnection(proxy.hostname, proxy.port, timeout=timeout)
+            entry = (conn, _proxy_auth_headers(proxy), True)
+        _CONNS[key] = entry
+    return entry
+
+def _drop_conn(scheme: str, netloc: str):
+    entry = _CONNS.pop((scheme, netloc), None)
+    if entry is not None:
+        try:
+            entry[0].close()
+        except Exception:
+            pass
 
 def _http_post_json(url: str, obj: Any, timeout: float, retries: int) -> bool:
     """
     Post JSON to URL with simple retry/backoff and redirect handling (preserve POST).
     obj can be a dict (single snapshot) or list (batch of snapshots).
+    The connection to each host is kept alive and reused by subsequent posts;
+    http_proxy/https_proxy/no_proxy are honored as with urllib.
     """
-    data = json.dumps(obj).encode("utf-8")
+    data = _dumps(obj)
     headers = {
         "Content-Type": "application/json; charset=utf-8",
         "Accept": "application/json",
-        "User-Agent": "oai-gnb-monitor/1.3 (+python-urllib)",
-        "Connection": "close",
+        "User-Agent": "oai-gnb-monitor/1.3 (+python-http.client)",
     }
 
     attempt = 0
@@ -231,58 +327,33 @@ def _http_post_json(url: str, obj: Any, timeout: float, retries: int) -> bool:
 
     current_url = url
     redirects = 0
+    stale_retried = False
 
     while True:
+        parts = urlsplit(current_url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        reused = (parts.scheme, parts.netloc) in _CONNS
         try:
-            req = request.Request(current_url, data=data, headers=headers, method="POST")
-            with request.urlopen(req, timeout=timeout) as resp:
-                code = getattr(resp, "status", 200)
-                if 200 <= code < 300:
-                    return True
-                _eprint(f"POST got non-2xx {code} at {current_url}")
-                return False
-
-        except error.HTTPError as e:
-            code = getattr(e, "code", None)
-            # Follow redirects and preserve POST
-            if code in (301, 302, 303, 307, 308):
-                loc = e.headers.get("Location") if hasattr(e, "headers") else None
-                if not loc:
-                    _eprint(f"Redirect {code} received but no Location header")
-                    return False
-                redirects += 1
-                if redirects > max_redirects:
-                    _eprint(f"Too many redirects, last Location: {loc}")
-                    return False
-                new_url = urljoin(current_url, loc)
-                _eprint(f"Following redirect {code} -> {new_url} (preserving POST)")
-                current_url = new_url
+            conn, proxy_headers, absolute_form = _get_conn(parts.scheme, parts.netloc, timeout)
+            if absolute_form:
+                conn.request("POST", current_url, body=data, headers={**headers, **proxy_headers})
+            else:
+                conn.request("POST", path, body=data, headers=headers)
+            resp = conn.getresponse()
+            # Always drain the body so the connection can be reused
+            body = resp.read()
+            code = resp.status
+
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+            _drop_conn(parts.scheme, parts.netloc)
+            # The server may have closed an idle keep-alive connection; reconnect once for free
+            if reused and not stale_retried:
+                stale_retried = True
+                _eprint(f"Keep-alive connection to {parts.netloc} was closed ({e}); reconnecting")
                 continue
-
-            # Handle 405 by toggling trailing slash once
-            if code == 405:
-                try:
-                    body = e.read().decode("utf-8", "ignore")[:200]
-                except Exception:
-                    body = ""
-                _eprint(f"HTTP 405 at {current_url}. Body (first 200 bytes): {body!r}")
-                alt_url = current_url[:-1] if current_url.endswith("/") else current_url + "/"
-                if alt_url != current_url:
-                    _eprint(f"Retrying with URL variant: {alt_url}")
-                    current_url = alt_url
-                    continue
-
-            transient = code in (429, 500, 502, 503, 504)
-            _eprint(f"HTTPError {code} at {current_url}. Transient={transient}")
-            attempt += 1
-            if not transient or attempt > retries:
-                return False
-            time.sleep(delay)
-            delay *= 2.0
-            continue
-
-        except error.URLError as e:
-            _eprint(f"URLError at {current_url}: {getattr(e, 'reason', e)}")
+            _eprint(f"Connection error at {current_url}: {e}")
             attempt += 1
             if attempt > retries:
                 return False
@@ -291,6 +362,7 @@ def _http_post_json(url: str, obj: Any, timeout: float, retries: int) -> bool:
             continue
 
         except Exception as e:
+            _drop_conn(parts.scheme, parts.netloc)
             _eprint(f"POST exception at {current_url}: {e}")
             attempt += 1
             if attempt > retries:
@@ -299,6 +371,41 @@ def _http_post_json(url: str, obj: Any, timeout: float, retries: int) -> bool:
             delay *= 2.0
             continue
 
+        if 200 <= code < 300:
+            return True
+
+        # Follow redirects and preserve POST
+        if code in (301, 302, 303, 307, 308):
+            loc = resp.getheader("Location")
+            if not loc:
+                _eprint(f"Redirect {code} received but no Location header")
+                return False
+            redirects += 1
+            if redirects > max_redirects:
+                _eprint(f"Too many redirects, last Location: {loc}")
+                return False
+            new_url = urljoin(current_url, loc)
+            _eprint(f"Following redirect {code} -> {new_url} (preserving POST)")
+            current_url = new_url
+            continue
+
+        # Handle 405 by toggling trailing slash once
+        if code == 405:
+            _eprint(f"HTTP 405 at {current_url}. Body (first 200 bytes): {body.decode('utf-8', 'ignore')[:200]!r}")
+            alt_url = current_url[:-1] if current_url.endswith("/") else current_url + "/"
+            if alt_url != current_url:
+                _eprint(f"Retrying with URL variant: {alt_url}")
+                current_url = alt_url
+                continue
+
+        transient = code in (429, 500, 502, 503, 504)
+        _eprint(f"HTTPError {code} at {current_url}. Transient={transient}")
+        attempt += 1
+        if not transient or attempt > retries:
+            return False
+        time.sleep(delay)
+        delay *= 2.0
+
 def _maybe_post_flush(force: bool = False):
     """
     Flush buffered snapshots to the POST URL according to _SEND_INTERVAL.
@@ -306,7 +413,7 @@ def _maybe_post_flush(force: bool = False):
     - If no new snapshot has arrived since the last send, the buffer will be empty and nothing is sent.
     - In batch mode (if enabled), send all buffered snapshots as an array.
     """
-    global _buffer, _last_post_ms
+    global _last_post_ms
     if not _POST_URL:
         return
     if not _buffer:
@@ -319,87 +426,173 @@ def _maybe_post_flush(force: bool = False):
     if _ONE_AT_A_TIME:
         # Send exactly one snapshot
         if _SEND_ORDER == "fifo":
-            item = _buffer.pop(0)
+            item = _buffer.popleft()
         else:  # latest
             item = _buffer[-1]
             _buffer.clear()
         ok = _http_post_json(_POST_URL, item, _POST_TIMEOUT, _MAX_RETRIES)
         if ok:
-            _counts["posted_batches"] += 1  # one object per request
-            _counts["posted_snapshots"] += 1
+            _counts[C_POSTED_BATCHES] += 1  # one object per request
+            _counts[C_POSTED_SNAPSHOTS] += 1
             _eprint(f"Posted 1 snapshot to {_POST_URL} (one-at-a-time, order={_SEND_ORDER})")
             _last_post_ms = now_ms
         else:
-            _counts["post_errors"] += 1
+            _counts[C_POST_ERRORS] += 1
             _eprint(f"Failed to post 1 snapshot to {_POST_URL} (one-at-a-time). Will retry after interval.")
+            _last_post_ms = now_ms
             # For FIFO, put it back so we can retry later; for latest, keep buffer empty and wait for newer snapshot
             if _SEND_ORDER == "fifo":
-                _buffer.insert(0, item)
+                _buffer.appendleft(item)
         return
 
     # Batch mode (array)
-    payload = _buffer[:]
+    payload = list(_buffer)
     ok = _http_post_json(_POST_URL, payload, _POST_TIMEOUT, _MAX_RETRIES)
     if ok:
-        _counts["posted_batches"] += 1
-        _counts["posted_snapshots"] += len(payload)
+        _counts[C_POSTED_BATCHES] += 1
+        _counts[C_POSTED_SNAPSHOTS] += len(payload)
         _eprint(f"Posted {len(payload)} snapshot(s) to {_POST_URL}")
         _buffer.clear()
         _last_post_ms = now_ms
     else:
-        _counts["post_errors"] += 1
+        _counts[C_POST_ERRORS] += 1
         _eprint(f"Failed to post batch of {len(payload)} snapshot(s) to {_POST_URL} (will retry after interval)")
+        _last_post_ms = now_ms
 
-def _emit_snapshot(ue: UEState, reason: str):
-    payload = {
-        "timestamp": _now_ms(),
-        "source": _SOURCE,
-        "ues": [
-            {
-                "pci": ue.get("pci") or 0,
-                "rnti": ue["rnti"],
-                "downlink": {
-                    "cqi": ue["dl"].get("cqi") if ue["dl"].get("cqi") is not None else 0,
-                    "ri": ue["dl"].get("ri") if ue["dl"].get("ri") is not None else 0,
-                    "mcs": ue["dl"].get("mcs") if ue["dl"].get("mcs") is not None else 0,
-                    "bitrate": int(ue["dl"].get("bitrate") or 0),
-                    "packets_ok": int(ue["dl"].get("packets_ok") or 0),
-                    "packets_nok": int(ue["dl"].get("packets_nok") or 0),
-                    "drop_rate": float(ue["dl"].get("drop_rate") or 0.0),
-                    "buffer_status": int(ue["dl"].get("buffer_status") or 0),
-                },
-                "uplink": {
-                    "pusch_sinr": float(ue["ul"].get("snr") or 0.0),
-                    "rsrp": float(ue.get("rsrp") or 0.0),
-                    "ri": ue["ul"].get("ri") if ue["ul"].get("ri") is not None else 0,
-                    "mcs": ue["ul"].get("mcs") if ue["ul"].get("mcs") is not None else 0,
-                    "bitrate": int(ue["ul"].get("bitrate") or 0),
-                    "packets_ok": int(ue["ul"].get("packets_ok") or 0),
-                    "packets_nok": int(ue["ul"].get("packets_nok") or 0),
-                    "drop_rate": float(ue["ul"].get("drop_rate") or 0.0),
-                    "bsr": int(ue["ul"].get("bsr") or 0),
-                    "timing_advance": int(ue["ul"].get("timing_advance") or 0),
-                    "phr": float(ue.get("phr") or 0.0),
-                },
-            }
-        ],
-    }
+def _enqueue_post(item: Any):
+    """
+    Hand a snapshot to the poster thread without blocking the parser.
+    If the queue is full (endpoint stalled): in the default latest mode the oldest queued
+    snapshot is dropped; in fifo/batch modes the new snapshot is dropped. Both are counted in
+    C_POST_QUEUE_DROPPED (this runs on the parser thread; see the counter slots).
+    """
+    latest = _ONE_AT_A_TIME and _SEND_ORDER == "latest"
+    while True:
+        try:
+            _post_q.put_nowait(item)
+            return
+        except queue.Full:
+            if not latest:
+                _counts[C_POST_QUEUE_DROPPED] += 1
+                return
+            try:
+                _post_q.get_nowait()
+                _counts[C_POST_QUEUE_DROPPED] += 1
+            except queue.Empty:
+                pass
+
+def _drain_buffer():
+    """
+    Final flush on shutdown: keep sending until _buffer is empty or a send fails,
+    and count whatever could not be sent as dropped.
+    """
+    while _buffer:
+        pending = len(_buffer)
+        _maybe_post_flush(force=True)
+        if len(_buffer) >= pending:
+            break
+    if _buffer:
+        _counts[C_POST_DROPPED] += len(_buffer)
+        _buffer.clear()
+
+def _poster_loop():
+    """
+    Poster thread: move queued snapshots into _buffer (keeping only the latest in the
+    default mode) and post them via _maybe_post_flush once per _SEND_INTERVAL.
+    On _POST_STOP, drain the buffer and exit.
+    """
+    latest = _ONE_AT_A_TIME and _SEND_ORDER == "latest"
+    stopping = False
+    while not stopping:
+        # Wait for new snapshots, but wake up when a buffered one becomes due
+        timeout = None
+        if _buffer:
+            timeout = max(0.0, (_last_post_ms + int(_SEND_INTERVAL * 1000) - _now_ms()) / 1000.0)
+        try:
+            item = _post_q.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        while item is not None:
+            if item is _POST_STOP:
+                stopping = True
+            elif latest:
+                _buffer.clear()
+                _buffer.append(item)
+            else:
+                if len(_buffer) == _BUFFER_MAX:
+                    _counts[C_POST_DROPPED] += 1  # deque evicts the oldest
+                _buffer.append(item)
+            try:
+                item = _post_q.get_nowait()
+            except queue.Empty:
+                item = None
+        try:
+            if stopping:
+                _drain_buffer()
+            else:
+                _maybe_post_flush(force=False)
+        except Exception as e:
+            _eprint(f"Poster error: {e}")
+
+def _start_poster():
+    global _poster
+    if _poster is None and _POST_URL:
+        _poster = threading.Thread(target=_poster_loop, name="snapshot-poster", daemon=True)
+        _poster.start()
+
+def _stop_poster():
+    """Ask the poster thread to flush what is left and wait for it to finish."""
+    global _poster
+    if _poster is None:
+        return
+    _post_q.put(_POST_STOP)  # blocking: the sentinel must not be dropped
+    _poster.join()
+    _poster = None
+
+def _compile_snapshot_builder():
+    """
+    Generate and compile _build_snapshot(ue, ts, src) from _SNAPSHOT_FIELDS: a single
+    dict literal with every field lookup and conversion spelled out, so building a
+    snapshot costs no loops or per-field function calls.
+    """
+    top: List[str] = []
+    sections: Dict[str, List[str]] = {}
+    for _col, section, key, state_key, conv in _SNAPSHOT_FIELDS:
+        item = f"{key!r}: " + conv.format(f"ue[{state_key!r}]")
+        (top if section is None else sections.setdefault(section, [])).append(item)
+    ue_items = top + [f"{sec!r}: {{{', '.join(items)}}}" for sec, items in sections.items()]
+    src = (
+        "def _build_snapshot(ue, ts, src):\n"
+        f"    return {{'timestamp': ts, 'source': src, 'ues': [{{{', '.join(ue_items)}}}]}}\n"
+    )
+    ns: Dict[str, Any] = {}
+    exec(compile(src, "<snapshot-builder>", "exec"), ns)
+    return ns["_build_snapshot"]
+
+_build_snapshot = _compile_snapshot_builder()
+
+def _emit_snapshot(ue: UEState, reason: str, ts: Optional[int] = None):
+    """
+    Emit a snapshot of one UE. ts is the line's timestamp in ms if the caller already
+    has one (avoids another clock read); otherwise the current time is used.
+    """
+    payload = _build_snapshot(ue, ts if ts is not None else _now_ms(), _SOURCE)
 
     # Local NDJSON output (immediate)
     _write_json_line(payload)
-    _counts["snapshots"] += 1
+    _counts[C_SNAPSHOTS] += 1
     _eprint(f"Snapshot emitted for RNTI {hex(ue['rnti'])} due to {reason}")
 
     # CSV output (immediate)
     _write_csv_rows(payload)
 
-    # Buffer for posting (delayed send): keep only latest by default
+    # Periodic flush, once both sinks hold this snapshot
+    if _FLUSH_EVERY and _counts[C_SNAPSHOTS] % _FLUSH_EVERY == 0:
+        _flush_sinks()
+
+    # Hand off for posting (delayed send by the poster thread)
     if _POST_URL:
-        if _ONE_AT_A_TIME and _SEND_ORDER == "latest":
-            _buffer.clear()
-            _buffer.append(payload)
-        else:
-            _buffer.append(payload)
+        _enqueue_post(payload)
 
 # Regex patterns for OAI periodic stats lines (supports variants)
 P_HEADER_SIMPLE = re.compile(
@@ -443,124 +636,154 @@ P_LCID = re.compile(
     re.IGNORECASE,
 )
 
-def process_line(line: str):
-    _counts["lines"] += 1
-    s = line.strip()
-    if not s:
-        return
-
-    # Ignore bracketed status lines (e.g., [NR_MAC] Frame.Slot), but still allow periodic post flush
-    if s.startswith("["):
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_HEADER_SIMPLE.search(s) or P_HEADER_OLD.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        if m.groupdict().get("phr") is not None:
-            ue["phr"] = float(m.group("phr"))
-        if m.groupdict().get("pcmax") is not None:
-            ue["pcmax"] = float(m.group("pcmax"))
-        if m.groupdict().get("rsrp") is not None:
-            try:
-                ue["rsrp"] = float(m.group("rsrp"))
-            except ValueError:
-                pass
-        if m.groupdict().get("sinsb") is not None:
-            try:
-                ue["ssb_sinr"] = float(m.group("sinsb"))
-            except ValueError:
-                pass
-        _counts["header"] += 1
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_CQI.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        ue["dl"]["cqi"] = int(m.group("cqi"))
-        ue["dl"]["ri"] = int(m.group("ri"))
-        _counts["cqi"] += 1
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_DLSCH_SIMPLE.search(s) or P_DLSCH_OLD.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        ue["dl"]["a"] = int(m.group("a"))
-        ue["dl"]["errors"] = int(m.group("errors"))
-        ue["dl"]["mcs"] = int(m.group("mcs"))
-        _update_pkt_stats(ue["dl"])
-        _counts["dlsch"] += 1
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_ULSCH_SIMPLE.search(s) or P_ULSCH_OLD.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        ue["ul"]["a"] = int(m.group("a"))
-        ue["ul"]["errors"] = int(m.group("errors"))
-        ue["ul"]["mcs"] = int(m.group("mcs"))
-        if m.groupdict().get("snr"):
-            try:
-                ue["ul"]["snr"] = float(m.group("snr"))
-            except ValueError:
-                pass
-        _update_pkt_stats(ue["ul"])
-        _counts["ulsch"] += 1
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_DLSCH_BYTES.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        cur_t_ms = _now_ms()
-        total_bytes = int(m.group("bytes"))
-        prev_bytes = ue["dl"]["last_total_bytes"]
-        prev_t = ue["dl"]["last_t_ms"]
-        bps = 4e6#_compute_bitrate(prev_bytes, prev_t, total_bytes, cur_t_ms)
-        if bps is not None:
-            ue["dl"]["bitrate"] = bps
-        ue["dl"]["total_bytes"] = total_bytes
-        ue["dl"]["last_total_bytes"] = total_bytes
-        ue["dl"]["last_t_ms"] = cur_t_ms
-        _counts["dl_bytes"] += 1
-        _maybe_post_flush(force=False)
-        return
-
-    m = P_ULSCH_BYTES_RX.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        cur_t_ms = _now_ms()
-        total_bytes_rx = int(m.group("bytes"))
-        prev_bytes_rx = ue["ul"]["last_total_bytes_rx"]
-        prev_t = ue["ul"]["last_t_ms"]
-        bps = 4e6#_compute_bitrate(prev_bytes_rx, prev_t, total_bytes_rx, cur_t_ms)
-        if bps is not None:
-            ue["ul"]["bitrate"] = bps
-        ue["ul"]["total_bytes_rx"] = total_bytes_rx
-        ue["ul"]["last_total_bytes_rx"] = total_bytes_rx
-        ue["ul"]["last_t_ms"] = cur_t_ms
-
-        _counts["ul_bytes"] += 1
-        _emit_snapshot(ue, reason="ul_bytes_rx")
-        _maybe_post_flush(force=False)
-        return
+# Single master regex: each pattern becomes a named alternative (the "kind" reported
+# by m.lastgroup) and its inner groups are prefixed with that kind to stay unique.
+# Alternatives are listed in the same priority order the patterns used to be tried in.
+_PATTERNS = [
+    ("hdr_simple", P_HEADER_SIMPLE),
+    ("hdr_old", P_HEADER_OLD),
+    ("cqi", P_CQI),
+    ("dlsch_simple", P_DLSCH_SIMPLE),
+    ("dlsch_old", P_DLSCH_OLD),
+    ("ulsch_simple", P_ULSCH_SIMPLE),
+    ("ulsch_old", P_ULSCH_OLD),
+    ("dl_bytes", P_DLSCH_BYTES),
+    ("ul_bytes", P_ULSCH_BYTES_RX),
+    ("lcid", P_LCID),
+]
+P_ALL = re.compile(
+    "|".join(
+        f"(?P<{kind}>" + re.sub(r"\(\?P<(\w+)>", rf"(?P<{kind}_\1>", p.pattern) + ")"
+        for kind, p in _PATTERNS
+    ),
+    re.IGNORECASE,
+)
 
-    m = P_LCID.search(s)
-    if m:
-        rnti = _parse_rnti(m.group("rnti"))
-        ue = _get_ue(rnti)
-        _counts["lcid"] += 1
-        _emit_snapshot(ue, reason="lcid_fallback")
-        _maybe_post_flush(force=False)
-        return
+def _make_processor():
+    """
+    Build the per-line processor. Module globals and bound methods used on every line
+    are captured as closure locals so the hot path avoids repeated global/attribute lookups.
+    """
+    counts = _counts
+    parse_rnti = _parse_rnti
+    get_ue = _get_ue
+    emit_snapshot = _emit_snapshot
+    now_ms = _now_ms
+    search = P_ALL.search
+
+    def process_line(line: str):
+        counts[C_LINES] += 1
+        s = line.strip()
+        if not s:
+            return
+
+        # Ignore bracketed status lines (e.g., [NR_MAC] Frame.Slot)
+        if s.startswith("["):
+            return
+
+        # Cheap literal pre-filter: every pattern needs "UE " (as OAI prints it), so most
+        # uninteresting lines are rejected by a C-level substring scan before any regex work
+        if "UE " not in s:
+            return
+
+        m = search(s)
+        if not m:
+            return
+        kind = m.lastgroup
+        g = kind + "_"
+        rnti = parse_rnti(m[g + "rnti"])
+        ue = get_ue(rnti)
+
+        if kind == "hdr_simple" or kind == "hdr_old":
+            # phr and pcmax are mandatory in both header patterns; rsrp is optional
+            ue["phr"] = float(m[g + "phr"])
+            ue["pcmax"] = float(m[g + "pcmax"])
+            rsrp = m[g + "rsrp"]
+            if rsrp is not None:
+                try:
+                    ue["rsrp"] = float(rsrp)
+                except ValueError:
+                    pass
+            # Only the old header format carries an SSB SINR
+            if kind == "hdr_old":
+                sinsb = m["hdr_old_sinsb"]
+                if sinsb is not None:
+                    try:
+                        ue["ssb_sinr"] = float(sinsb)
+                    except ValueError:
+                        pass
+            counts[C_HEADER] += 1
+            return
+
+        if kind == "cqi":
+            ue["dl_cqi"] = int(m[g + "cqi"])
+            ue["dl_ri"] = int(m[g + "ri"])
+            counts[C_CQI] += 1
+            return
+
+        if kind == "dlsch_simple" or kind == "dlsch_old":
+            a = int(m[g + "a"])
+            errors = int(m[g + "errors"])
+            ue["dl_a"] = a
+            ue["dl_errors"] = errors
+            ue["dl_mcs"] = int(m[g + "mcs"])
+            # Packet stats, inlined since this runs for every DLSCH line
+            ue["dl_packets_ok"] = a - errors if a > errors else 0
+            ue["dl_packets_nok"] = errors
+            ue["dl_drop_rate"] = (errors / a * 100.0) if a > 0 else 0.0
+            counts[C_DLSCH] += 1
+            return
+
+        if kind == "ulsch_simple" or kind == "ulsch_old":
+            a = int(m[g + "a"])
+            errors = int(m[g + "errors"])
+            ue["ul_a"] = a
+            ue["ul_errors"] = errors
+            ue["ul_mcs"] = int(m[g + "mcs"])
+            # Only the old ULSCH format carries an SNR
+            if kind == "ulsch_old":
+                snr = m["ulsch_old_snr"]
+                if snr:
+                    try:
+                        ue["ul_snr"] = float(snr)
+                    except ValueError:
+                        pass
+            # Packet stats, inlined since this runs for every ULSCH line
+            ue["ul_packets_ok"] = a - errors if a > errors else 0
+            ue["ul_packets_nok"] = errors
+            ue["ul_drop_rate"] = (errors / a * 100.0) if a > 0 else 0.0
+            counts[C_ULSCH] += 1
+            return
+
+        if kind == "dl_bytes":
+            cur_t_ms = now_ms()
+            total_bytes = int(m[g + "bytes"])
+            ue["dl_bitrate"] = 4e6  # fixed placeholder; not derived from the byte counters
+            ue["dl_total_bytes"] = total_bytes
+            ue["dl_last_total_bytes"] = total_bytes
+            ue["dl_last_t_ms"] = cur_t_ms
+            counts[C_DL_BYTES] += 1
+            return
+
+        if kind == "ul_bytes":
+            cur_t_ms = now_ms()
+            total_bytes_rx = int(m[g + "bytes"])
+            ue["ul_bitrate"] = 4e6  # fixed placeholder; not derived from the byte counters
+            ue["ul_total_bytes_rx"] = total_bytes_rx
+            ue["ul_last_total_bytes_rx"] = total_bytes_rx
+            ue["ul_last_t_ms"] = cur_t_ms
+
+            counts[C_UL_BYTES] += 1
+            emit_snapshot(ue, reason="ul_bytes_rx", ts=cur_t_ms)
+            return
+
+        # kind == "lcid"
+        counts[C_LCID] += 1
+        emit_snapshot(ue, reason="lcid_fallback")
+
+    return process_line
+
+process_line = _make_processor()
 
 def stream_gnb_log(path: str, follow: bool):
     """Stream gNB logs from a file and parse lines."""
@@ -568,25 +791,34 @@ def stream_gnb_log(path: str, follow: bool):
         if _VERBOSE:
             size = os.path.getsize(path) if os.path.exists(path) else -1
             _eprint(f"Reading gNB output from {path} (follow={follow}) size={size} bytes")
+        _start_poster()
+        process = process_line
         with open(path, "r", encoding="utf-8", errors="replace") as f:
+            if not follow:
+                # One pass: the buffered file iterator is the fastest way through a static log
+                for line in f:
+                    process(line)
+                return
+            # Follow: read in blocks and keep a trailing partial line until it is completed
+            read = f.read
+            leftover = ""
             while True:
-                line = f.readline()
-                if not line:
-                    if not follow:
-                        break
-                    # Idle: still flush posts if due
-                    _maybe_post_flush(force=False)
+                chunk = read(_READ_CHUNK)
+                if not chunk:
+                    # Idle: make output visible
+                    _flush_sinks()
                     time.sleep(0.1)
                     continue
-                process_line(line)
-                _maybe_post_flush(force=False)
+                lines = (leftover + chunk).split("\n")
+                leftover = lines.pop()
+                for line in lines:
+                    process(line)
     except KeyboardInterrupt:
         _eprint(f"Stopped reading gNB output from {path}")
     finally:
-        # Final flush for any buffered posts
-        _maybe_post_flush(force=True)
-        # Close output file if needed
+        # Flush and close local output first: the final POST may stall on a slow endpoint
         global _OUT_FP, _CSV_FP
+        _flush_sinks()
         if _OUT_FP is not None:
             try:
                 _OUT_FP.close()
@@ -599,14 +831,14 @@ def stream_gnb_log(path: str, follow: bool):
             except Exception:
                 pass
             _CSV_FP = None
+        # Final flush for any buffered posts
+        _stop_poster()
         if _VERBOSE:
-            _eprint(
-                f"Summary: lines={_counts['lines']}, headers={_counts['header']}, "
-                f"cqi={_counts['cqi']}, dlsch={_counts['dlsch']}, ulsch={_counts['ulsch']}, "
-                f"dl_bytes={_counts['dl_bytes']}, ul_bytes={_counts['ul_bytes']}, lcid={_counts['lcid']}, "
-                f"snapshots={_counts['snapshots']}, posted_batches={_counts['posted_batches']}, "
-                f"posted_snapshots={_counts['posted_snapshots']}, post_errors={_counts['post_errors']}"
-            )
+            _eprint("Summary: " + ", ".join(f"{name}={n}" for name, n in zip(_COUNT_NAMES, _counts)))
+
+def _handle_sigterm(signum, frame):
+    # Unwind through stream_gnb_log's finally so buffered output and posts are flushed
+    raise SystemExit(128 + signum)
 
 def _parse_args():
     p = argparse.ArgumentParser(description="Parse OAI gNB periodic stats, output/POST snapshots, and CSV.")
@@ -619,6 +851,8 @@ def _parse_args():
     p.add_argument("--post-timeout", type=float, default=5.0, help="HTTP POST timeout in seconds (default: 5).")
     p.add_argument("--retries", type=int, default=3, help="Max HTTP POST retries on transient failures (default: 3).")
     p.add_argument("--csv", default="", help="CSV output path (rows are written immediately, no delay).")
+    p.add_argument("--flush-every", type=int, default=0,
+                   help="Flush NDJSON/CSV output every N snapshots (default: 0 = only when idle and at exit).")
     p.add_argument("--source", default="OAI", help='Value for the "source" field in snapshots (default: OAI).')
 
     # Control posting behavior; defaults are: one-at-a-time + latest
@@ -634,8 +868,10 @@ def _parse_args():
 
 if __name__ == "__main__":
     args = _parse_args()
+    signal.signal(signal.SIGTERM, _handle_sigterm)
     _VERBOSE = bool(args.verbose)
     _SOURCE = args.source
+    _FLUSH_EVERY = max(0, int(args.flush_every))
     _set_output(args.output)
     if args.csv:
         _set_csv_output(args.csv)
@@ -3,119 +3,170 @@ import time
 import json
 import csv
 import requests
+from requests.adapters import HTTPAdapter
 
 input_file = "output.txt"
 csv_file = "gnb.csv"
 endpoint_url = "https://af-25.vercel.app/api/ingest"  # aggiorna con il tuo URL
 send_every = 10  # invia ogni 10 righe
 
+# keep-alive HTTP session reused for every POST (no new TCP/TLS handshake per send)
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 # regex for capturing pci, rnti, DL e UL
 pattern = re.compile(
     r"\s*(\d+)\s+(\d+)\s+(\S+)\s+(\d+)\s+(\d+)\s+(\S+)\s+(\d+)\s+(\d+)\s+(\S+)\s+(\d+)\s*\|\s*(\S+)\s+(\d+)\s+(\S+)\s+(\d+)\s+(\d+)\s+(\S+)\s+(\d+)"
 )
 
-def convert_value(val):
-    """Converti '1.4k' -> 1400, '50%' -> 50, 'n/a' -> None"""
-    if val.lower().endswith("k"):
-        return int(float(val[:-1]) * 1000)
-    elif val.lower().endswith("M"):
-        return int(float(val[:-1]) * 1000000)
-    elif val.endswith("%"):
-        return int(val[:-1])
-    elif val.lower() == "n/a":
-        return None
-    else:
+# columns the regex requires to be plain integers (\d+): pci, rnti, ri, mcs, ok, nok, dl_bs | mcs, ok, nok, bsr
+_DL_DIGIT_COLS = (0, 1, 3, 4, 6, 7, 9)
+_UL_DIGIT_COLS = (1, 3, 4, 6)
+
+def split_row(line):
+    """Return the 17 raw fields of a metrics row (10 DL | 7 UL), or None if it is not one.
+
+    Well-formed rows are split on '|' and whitespace; the regex is only used as a
+    fallback for rows that do not have exactly 10 + 7 columns with integers where
+    the regex expects them."""
+    left, sep, right = line.partition("|")
+    lf = left.split()
+    rf = right.split()
+    if (sep and len(lf) == 10 and len(rf) == 7
+            and all(lf[i].isdigit() for i in _DL_DIGIT_COLS)
+            and all(rf[i].isdigit() for i in _UL_DIGIT_COLS)):
+        return lf + rf
+    match = pattern.match(line)
+    if match:
+        return match.groups()
+    return None
+
+def _kilo(val):
+    return int(float(val[:-1]) * 1000)
+
+def _mega(val):
+    return int(float(val[:-1]) * 1000000)
+
+def _percent(val):
+    return int(val[:-1])
+
+def _plain(val):
+    try:
+        return int(val)
+    except:
         try:
-            return int(val)
+            return float(val)
         except:
-            try:
-                return float(val)
-            except:
-                return val
-
-# csv header
-with open(csv_file, "a", newline="") as f:
-    writer = csv.writer(f)
-    if f.tell() == 0:
-        writer.writerow([
-            "timestamp",
-            "pci", "rnti",
-            "cqi_dl", "ri_dl", "mcs_dl", "brate_dl", "ok_dl", "nok_dl", "perc_dl", "dl_bs",
-            "pusch_ul", "mcs_ul", "brate_ul", "ok_ul", "nok_ul", "perc_ul", "bsr"
-        ])
+            return val
+
+# conversione scelta in base all'ultimo carattere (suffisso)
+_SUFFIX_CONVERTERS = {"k": _kilo, "K": _kilo, "M": _mega, "m": _mega, "%": _percent}
+_NA_VALUES = frozenset(("n/a", "N/A"))
+
+def convert_value(val):
+    """Converti '1.4k' -> 1400, '3.2M' -> 3200000, '50%' -> 50, 'n/a' -> None"""
+    if val in _NA_VALUES:
+        return None
+    conv = _SUFFIX_CONVERTERS.get(val[-1:])
+    if conv is not None:
+        return conv(val)
+    return _plain(val)
+
+# csv output: one handle and one writer for the whole run (large buffer, flushed when idle)
+csv_fp = open(csv_file, "a", newline="", buffering=1 << 16)
+writer = csv.writer(csv_fp)
+if csv_fp.tell() == 0:
+    writer.writerow([
+        "timestamp",
+        "pci", "rnti",
+        "cqi_dl", "ri_dl", "mcs_dl", "brate_dl", "ok_dl", "nok_dl", "perc_dl", "dl_bs",
+        "pusch_ul", "mcs_ul", "brate_ul", "ok_ul", "nok_ul", "perc_ul", "bsr"
+    ])
 
 line_count = 0  # contatore delle righe per invio HTTP
+pending_rows = []  # righe CSV scritte in blocco ogni "send_every" righe (o quando idle)
+
+
+try:
+    with open(input_file, "r") as f:
+        f.seek(0, 2)  # vai alla fine del file
+        while True:
+            line = f.readline()
+            if not line:
+                if pending_rows:
+                    writer.writerows(pending_rows)
+                    pending_rows.clear()
+                csv_fp.flush()
+                time.sleep(0.1)
+                continue
+
+            line = line.strip()
+            if not line or line.startswith("pci") or line.startswith("-"):
+                continue
+
+            groups = split_row(line)
+            if groups:
+                values = [convert_value(v) for v in groups]
 
+                pci = values[0]
+                rnti = values[1]
+                cqi_dl, ri_dl, mcs_dl, brate_dl, ok_dl, nok_dl, perc_dl, dl_bs = values[2:10]
+                pusch_ul, mcs_ul, brate_ul, ok_ul, nok_ul, perc_ul, bsr = values[10:]
 
-with open(input_file, "r") as f:
-    f.seek(0, 2)  # vai alla fine del file
-    while True:
-        line = f.readline()
-        if not line:
-            time.sleep(0.1)
-            continue
-
-        line = line.strip()
-        if not line or line.startswith("pci") or line.startswith("-"):
-            continue
-
-        match = pattern.match(line)
-        if match:
-            groups = match.groups()
-            values = [convert_value(v) for v in groups]
-
-            pci = values[0]
-            rnti = values[1]
-            cqi_dl, ri_dl, mcs_dl, brate_dl, ok_dl, nok_dl, perc_dl, dl_bs = values[2:10]
-            pusch_ul, mcs_ul, brate_ul, ok_ul, nok_ul, perc_ul, bsr = values[10:]
-
-            timestamp = int(time.time() * 1000)  # millisecondi
-
-            # save in CSV file
-            with open(csv_file, "a", newline="") as out_f:
-                writer = csv.writer(out_f)
-                writer.writerow([timestamp, pci, rnti,
-                                 cqi_dl, ri_dl, mcs_dl, brate_dl, ok_dl, nok_dl, perc_dl, dl_bs,
-                                 pusch_ul, mcs_ul, brate_ul, ok_ul, nok_ul, perc_ul, bsr])
-
-            line_count += 1
-
-            # send every "send_every" measurements
-            if line_count % send_every == 0:
-                srsRANData = {
-                    "timestamp": timestamp,
-                    "source": "srsRAN",
-                    "ues": [
-                        {
-                            "pci": pci,
-                            "rnti": rnti,
-                            "downlink": {
-                                "cqi": cqi_dl,
-                                "ri": ri_dl,
-                                "mcs": mcs_dl,
-                                "bitrate": brate_dl,
-                                "packets_ok": ok_dl,
-                                "packets_nok": nok_dl,
-                                "drop_rate": perc_dl,
-                                "buffer_status": dl_bs
-                            },
-                            "uplink": {
-                                "pusch_sinr": pusch_ul,
-                                "mcs": mcs_ul,
-                                "bitrate": brate_ul,
-                                "packets_ok": ok_ul,
-                                "packets_nok": nok_ul,
-                                "drop_rate": perc_ul,
-                                "bsr": bsr
+                timestamp = int(time.time() * 1000)  # millisecondi
+
+                # save in CSV file (batched)
+                pending_rows.append([timestamp, pci, rnti,
+                                     cqi_dl, ri_dl, mcs_dl, brate_dl, ok_dl, nok_dl, perc_dl, dl_bs,
+                                     pusch_ul, mcs_ul, brate_ul, ok_ul, nok_ul, perc_ul, bsr])
+
+                line_count += 1
+
+                # write the batched CSV rows and send every "send_every" measurements
+                if line_count % send_every == 0:
+                    writer.writerows(pending_rows)
+                    pending_rows.clear()
+
+                    srsRANData = {
+                        "timestamp": timestamp,
+                        "source": "srsRAN",
+                        "ues": [
+                            {
+                                "pci": pci,
+                                "rnti": rnti,
+                                "downlink": {
+                                    "cqi": cqi_dl,
+                                    "ri": ri_dl,
+                                    "mcs": mcs_dl,
+                                    "bitrate": brate_dl,
+                                    "packets_ok": ok_dl,
+                                    "packets_nok": nok_dl,
+                                    "drop_rate": perc_dl,
+                                    "buffer_status": dl_bs
+                                },
+                                "uplink": {
+                                    "pusch_sinr": pusch_ul,
+                                    "mcs": mcs_ul,
+                                    "bitrate": brate_ul,
+                                    "packets_ok": ok_ul,
+                                    "packets_nok": nok_ul,
+                                    "drop_rate": perc_ul,
+                                    "bsr": bsr
+                                }
                             }
-                        }
-                    ]
-                }
-
-                try:
-                    response = requests.post(endpoint_url, json=srsRANData)
-                    print(f"Sending")
-                    if response.status_code != 200:
-                        print(f"Warning: HTTP {response.status_code}")
-                except Exception as e:
-                    print(f"Error sending data: {e}")
\ No newline at end of file
+                        ]
+                    }
+
+                    try:
+                        response = session.post(endpoint_url, json=srsRANData)
+                        print(f"Sending")
+                        if response.status_code != 200:
+                            print(f"Warning: HTTP {response.status_code}")
+                    except Exception as e:
+                        print(f"Error sending data: {e}")
+finally:
+    # on exit (e.g. Ctrl-C) write the rows still batched and flush the CSV
+    if pending_rows:
+        writer.writerows(pending_rows)
+    csv_fp.flush()